@@ -1,65 +1,79 @@
 # see https://github.com/inveniosoftware/docs-invenio-rdm-restapi-example
 # and https://inveniordm.docs.cern.ch/reference/rest_api_index/
-import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain, islice
 import sys
-import urllib3
-
-import requests
+import threading
+from typing import Iterator
 
+from client import records_url, session, workers
+from names import prime_ner
 from record import Record
 from utils import find_items
 
-# shut up urllib3 SSL verification warning
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-token = os.environ.get("INVENIO_TOKEN") or os.environ.get("TOKEN")
-if not token:
-    raise Exception(
-        "Error: provide a personal access token in the TOKEN or INVENIO_TOKEN env var"
-    )
+print_lock = threading.Lock()
+
+
+def log(*args) -> None:
+    # keep output from concurrent posts from interleaving mid-line
+    with print_lock:
+        print(*args)
 
 
-def post(r: Record):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}",
-    }
+def post(data: dict):
     # create metadata-only draft
-    draft_response = requests.post(
-        "https://127.0.0.1:5000/api/records",  # TODO config for domain, port
-        json=r.get(),
-        verify=False,
-        headers=headers,
+    draft_response = session.post(
+        records_url,
+        json=data,
     )
-    print("HTTP {}".format(draft_response.status_code))
+    log("HTTP {}".format(draft_response.status_code))
     if draft_response.status_code > 201:
-        print(draft_response.text)
+        log(draft_response.text)
     draft_response.raise_for_status()
     draft_record = draft_response.json()
-    print(draft_record["links"]["self"])
+    log(draft_record["links"]["self"])
     # TODO add files to draft record
     # publish
-    publish_response = requests.post(
-        f"https://127.0.0.1:5000/api/records/{draft_record['id']}/draft/actions/publish",
-        headers=headers,
-        verify=False,
+    publish_response = session.post(
+        f"{records_url}/{draft_record['id']}/draft/actions/publish",
     )
-    print("HTTP {}".format(publish_response.status_code))
+    log("HTTP {}".format(publish_response.status_code))
     if publish_response.status_code > 201:
-        print(publish_response.text)
+        log(publish_response.text)
     publish_response.raise_for_status()
     published_record = publish_response.json()
-    print(published_record["links"]["self_html"])
+    log(published_record["links"]["self_html"])
 
     # you can use /api/records/<id>/communities
     # see https://github.com/inveniosoftware/invenio-rdm-records/blob/master/tests/resources/test_resources_communities.py#L32
     return published_record
 
 
-if __name__ == "__main__":
+def records(files: list[str]) -> Iterator[dict]:
     # support passing any number of single item json, search results json, or XML metadata files
-    for file in sys.argv[1:]:
-        items = find_items(file)
-        for item in items:
-            r = Record(item)
+    # records are converted here, in the main thread, so the post() threads only do
+    # network I/O and NER never runs on the shared spacy model from several threads
+    items = (item for file in files for item in find_items(file))
+    # take as many items as the pool keeps pending so their NER runs in one batch
+    for window in iter(lambda: list(islice(items, workers * 2)), []):
+        window_records = [Record(item) for item in window]
+        prime_ner(chain.from_iterable(r.nameparts for r in window_records))
+        for r in window_records:
             r.attachments = []  # use import.py to add files
-            post(r)
+            yield r.get()
+
+
+if __name__ == "__main__":
+    # each record is independent, post them in parallel but only convert a few
+    # records ahead of the workers so a large search dump isn't built up front
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for data in records(sys.argv[1:]):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                # surface errors raised in post()
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(post, data))
+        for future in pending:
+            future.result()
@@ -0,0 +1,47 @@
+"""Connection settings and a shared HTTP session for the scripts that talk to
+InvenioRDM (api.py and import.py). Importing this module reads the config once;
+every request made through `session` reuses its pooled connections."""
+
+from collections.abc import Mapping
+import os
+from types import MappingProxyType
+import urllib3
+
+from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# shut up urllib3 SSL verification warning
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# load config from .env
+load_dotenv()
+token: str | None = os.environ.get("INVENIO_TOKEN") or os.environ.get("TOKEN")
+if not token:
+    raise Exception(
+        "Error: provide a personal access token in the TOKEN or INVENIO_TOKEN env var"
+    )
+port: str | None = os.environ.get("PORT")
+domain: str = f"https://{os.environ['HOST']}{f':{port}' if port else ''}"
+records_url: str = f"{domain}/api/records"
+verify: bool = os.environ.get("HTTPS_VERIFY", "").lower() == "true"
+# read-only, every request gets these through the session
+headers: Mapping[str, str] = MappingProxyType(
+    {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}",
+    }
+)
+
+# requests are made concurrently (records in api.py, files in import.py)
+workers = 8
+# one session for every call so the connection to Invenio is kept alive
+session = requests.Session()
+session.headers.update(headers)
+session.verify = verify
+session.mount(
+    "https://",
+    HTTPAdapter(pool_maxsize=workers, max_retries=Retry(total=5, backoff_factor=0.3)),
+)
@@ -1,39 +1,23 @@
 # see https://github.com/inveniosoftware/docs-invenio-rdm-restapi-example
 # and https://inveniordm.docs.cern.ch/reference/rest_api_index/
+from concurrent.futures import ThreadPoolExecutor
 import json
-import os
 from pathlib import Path
-import urllib3
 
 import click
-from dotenv import load_dotenv
 import requests
 
+from client import records_url, session, workers
 from record import Record
 
-# shut up urllib3 SSL verification warning
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-token: str | None = os.environ.get("INVENIO_TOKEN") or os.environ.get("TOKEN")
-if not token:
-    raise Exception(
-        "Error: provide a personal access token in the TOKEN or INVENIO_TOKEN env var"
-    )
-
-# load config from .env
-load_dotenv()
-port: str | None = os.environ.get("PORT")
-domain: str = f"https://{os.environ['HOST']}{f':{port}' if port else ''}"
-verify: bool = os.environ.get("HTTPS_VERIFY", "").lower() == "true"
-headers = {
-    "Accept": "application/json",
-    "Content-Type": "application/json",
-    "Authorization": f"Bearer {token}",
-}
+# file content uploads override the session's JSON content type
+binary_headers: dict[str, str] = {"Content-Type": "application/octet-stream"}
 
 
-def verbose_print(*args) -> None:
+def verbose_print(response: requests.Response) -> None:
+    # only format the status line when it will actually be printed
     if verbose:
-        click.echo(*args)
+        click.echo(f"HTTP {response.status_code} {response.url}")
 
 
 def get_item(itemjson: Path) -> dict:
@@ -42,13 +26,8 @@ def get_item(itemjson: Path) -> dict:
 
 
 def create_draft(record: dict) -> dict:
-    draft_response = requests.post(
-        f"{domain}/api/records",
-        json=record,
-        verify=verify,
-        headers=headers,
-    )
-    verbose_print(f"HTTP {draft_response.status_code} {draft_response.url}")
+    draft_response = session.post(records_url, json=record)
+    verbose_print(draft_response)
     if draft_response.status_code > 201:
         click.echo(draft_response.text, err=True)
     draft_response.raise_for_status()
@@ -56,73 +35,63 @@ def create_draft(record: dict) -> dict:
     return draft_record
 
 
-def add_files(dir: Path, record: Record, draft: dict):
+def upload_file(dir: Path, files_url: str, attachment: dict, commit_link: str) -> None:
+    # a file's commit only depends on its own upload so do them back to back
+    with open(dir / attachment["name"], "rb") as f:
+        upload_response: requests.Response = session.put(
+            f"{files_url}/{attachment['name']}/content",
+            data=f,
+            headers=binary_headers,
+        )
+        verbose_print(upload_response)
+        upload_response.raise_for_status()
+
+    commit_response: requests.Response = session.post(commit_link)
+    verbose_print(commit_response)
+    commit_response.raise_for_status()
+
+
+def add_files(dir: Path, record: Record, draft: dict, data: dict):
     # add files to draft record
-    # four steps: initiate, upload (all), commit (all), set default preview
+    # three steps: initiate, upload & commit (each file), set default preview
     # ! Unable to set order as API docs suggest, files.order is dropped
     # ! https://github.com/inveniosoftware/invenio-app-rdm/issues/2573
 
+    files_url: str = draft["links"]["files"]
     keys = [{"key": att["name"]} for att in record.attachments]
-    init_response: requests.Response = requests.post(
-        draft["links"]["files"],
-        json=keys,
-        headers=headers,
-        verify=verify,
-    )
-    verbose_print(f"HTTP {init_response.status_code} {init_response.url}")
+    init_response: requests.Response = session.post(files_url, json=keys)
+    verbose_print(init_response)
     init_response.raise_for_status()
     init_data = init_response.json()
     # click.echo(json.dumps(init_data, indent=2))
 
-    # upload one by one
-    # TODO use httpx to do in parallel?
-    for attachment in record.attachments:
-        binary_headers: dict[str, str] = headers.copy()
-        binary_headers["Content-Type"] = "application/octet-stream"
-        with open(dir / attachment["name"], "rb") as f:
-            upload_response: requests.Response = requests.put(
-                f"{domain}/api/records/{draft['id']}/draft/files/{attachment['name']}/content",
-                data=f,
-                headers=binary_headers,
-                verify=verify,
+    # files are independent of each other so upload & commit them in parallel
+    commit_links = {e["key"]: e["links"]["commit"] for e in init_data["entries"]}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() surfaces any exception raised in a thread
+        list(
+            executor.map(
+                lambda a: upload_file(dir, files_url, a, commit_links[a["name"]]),
+                record.attachments,
             )
-            verbose_print(f"HTTP {upload_response.status_code} {upload_response.url}")
-            upload_response.raise_for_status()
-
-    # commit one by one
-    # TODO httpx parallel
-    for commit_link in [entry["links"]["commit"] for entry in init_data["entries"]]:
-        commit_response: requests.Response = requests.post(
-            commit_link,
-            headers=headers,
-            verify=verify,
         )
-        verbose_print(f"HTTP {commit_response.status_code} {commit_response.url}")
-        commit_response.raise_for_status()
 
     # set default preview which was in our original record
-    preview_response: requests.Response = requests.put(
-        draft["links"]["self"],
-        json=record.get(),
-        headers=headers,
-        verify=verify,
-    )
-    verbose_print(f"HTTP {preview_response.status_code} {preview_response.url}")
+    # a draft PUT replaces all its metadata so send the full record or nothing
+    preview: str = data["files"]["default_preview"]
+    if draft.get("files", {}).get("default_preview") == preview:
+        return
+    preview_response: requests.Response = session.put(draft["links"]["self"], json=data)
+    verbose_print(preview_response)
     preview_response.raise_for_status()
     # click.echo(json.dumps(order_data, indent=2))
 
 
 def publish(draft: dict) -> dict:
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token}",
-    }
-    publish_response = requests.post(
-        f"{domain}/api/records/{draft['id']}/draft/actions/publish",
-        headers=headers,
-        verify=verify,
+    publish_response = session.post(
+        f"{records_url}/{draft['id']}/draft/actions/publish"
     )
-    verbose_print(f"HTTP {publish_response.status_code} {publish_response.url}")
+    verbose_print(publish_response)
     if publish_response.status_code > 201:
         click.echo(publish_response.text, err=True)
     publish_response.raise_for_status()
@@ -130,26 +99,17 @@ def publish(draft: dict) -> dict:
     return published_record
 
 
-@click.command(
-    help="Import items and their attachments into InvenioRDM. This expects a directory formatted like the equella_scripts/collection-export tool with attachments inside and a metadata subdirectory with an item.json file."
-)
-@click.help_option("-h", "--help")
-@click.argument("dir", type=click.Path(exists=True), required=True)
-# TODO option to ignore errors which skips assert statements & response.raise_for_status()
-# @click.option("--ignore-errors", "-i", help="Ignore errors and continue", is_flag=True)
-@click.option("--verbose", "-v", "is_verbose", help="Print more output", is_flag=True)
-def main(dir: str, is_verbose: bool):
-    global verbose
-    verbose = is_verbose
-
-    item = get_item(Path(dir) / "metadata" / "item.json")
+def import_item(dir: Path) -> None:
+    item = get_item(dir / "metadata" / "item.json")
     record = Record(item)
 
     click.echo(f"Importing {record.title} from {dir}...")
-    draft = create_draft(record.get())
+    # build the record dict once, it's sent with the draft and again with the files
+    data = record.get()
+    draft = create_draft(data)
 
     if len(record.attachments):
-        add_files(Path(dir), record, draft)
+        add_files(dir, record, draft, data)
 
     published_record = publish(draft)
 
@@ -159,5 +119,34 @@ def main(dir: str, is_verbose: bool):
     click.echo(f"Published: {published_record['links']['self_html']}")
 
 
+@click.command(
+    help="Import items and their attachments into InvenioRDM. This expects a directory formatted like the equella_scripts/collection-export tool with attachments inside and a metadata subdirectory with an item.json file."
+)
+@click.help_option("-h", "--help")
+@click.argument("dir", type=click.Path(exists=True), required=True)
+# TODO option to ignore errors which skips assert statements & response.raise_for_status()
+# @click.option("--ignore-errors", "-i", help="Ignore errors and continue", is_flag=True)
+@click.option(
+    "--batch",
+    "-b",
+    "is_batch",
+    help="Import every item directory inside DIR",
+    is_flag=True,
+)
+@click.option("--verbose", "-v", "is_verbose", help="Print more output", is_flag=True)
+def main(dir: str, is_batch: bool, is_verbose: bool):
+    global verbose
+    verbose = is_verbose
+
+    if not is_batch:
+        import_item(Path(dir))
+        return
+
+    # one process & HTTP session for the whole export instead of one per item
+    for subdir in sorted(Path(dir).iterdir()):
+        if (subdir / "metadata" / "item.json").exists():
+            import_item(subdir)
+
+
 if __name__ == "__main__":
     main()
@@ -11,6 +11,7 @@
 # in the "vocabs" dir and includes them in the cca_local subject. The 2 YAML files are written to the
 # vocab directory and the JSON file is written to the migrate directory.
 import csv
+from functools import lru_cache
 import json
 from pathlib import Path
 import sys
@@ -18,41 +19,64 @@ import uuid
 
 import yaml
 
+# libyaml's C parser & emitter when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader
 
+
+# statuses of rows left out of the map & vocabs entirely
+skip_statuses: frozenset[str] = frozenset(("omit", "problem", ""))
+
+
+# combined CSV rows & premade vocab terms repeat terms, only hash each once
+@lru_cache(maxsize=None)
 def get_uuid(term: str) -> str:
     # TODO use real identifiers, NS_URL chosen b/c there's no ideal option
     return str(uuid.uuid5(uuid.NAMESPACE_URL, term))
 
 
 def dump_all(subjects_map, cca_local, lc):
-    with open("migrate/subjects_map.json", "w") as file:
+    with open("migrate/subjects_map.json", "w", encoding="utf-8") as file:
         json.dump(subjects_map, file, indent=2)
-    with open("vocab/cca_local.yaml", "w") as file:
-        yaml.dump(cca_local, file)
-    with open("vocab/lc.yaml", "w") as file:
-        yaml.dump(lc, file)
+    with open("vocab/cca_local.yaml", "w", encoding="utf-8") as file:
+        yaml.dump(cca_local, file, Dumper=SafeDumper, allow_unicode=True)
+    with open("vocab/lc.yaml", "w", encoding="utf-8") as file:
+        yaml.dump(lc, file, Dumper=SafeDumper, allow_unicode=True)
 
 
 def main(file: str):
-    with open(file, "r") as fp:
+    with open(file, "r", encoding="utf-8") as fp:
         subjects_map: dict[str, str] = {}
         cca_local: list[dict[str, str]] = []
         lc: list[dict[str, str]] = []
-
-        reader = csv.DictReader(fp)
+        # vocab lists by subject scheme
+        vocabs: dict[str, list[dict[str, str]]] = {"cca_local": cca_local, "lc": lc}
+
+        reader = csv.reader(fp)
+        # find column positions once rather than building a dict for every row
+        header: list[str] = next(reader)
+        auth_col, status_col, new_value_col, vault_value_col, uri_col = (
+            header.index(column)
+            for column in ("Auth", "Status", "New Value", "VAULT value", "Auth URI")
+        )
         for row in reader:
-            auth: str = row["Auth"]
-            status: str = row["Status"].lower()  # omit, combine, done, problem
-            term: str = row["New Value"] if row["New Value"] else row["VAULT value"]
+            auth: str = row[auth_col]
+            auth_upper: str = auth.upper()
+            status: str = row[status_col].lower()  # omit, combine, done, problem
+            new_value: str = row[new_value_col]
+            vault_value: str = row[vault_value_col]
+            term: str = new_value or vault_value
             subject: dict[str, str] = {"subject": term}
 
-            if status in ("omit", "problem", ""):
+            if status in skip_statuses:
                 continue
 
-            if auth.upper() == "LOCAL":
+            if auth_upper == "LOCAL":
                 # Combined local subjects _must_ have a new value
                 if status == "combine":
-                    if not row["New Value"]:
+                    if not new_value:
                         raise ValueError(
                             f"Combined local subject without a New Value: {term}"
                         )
@@ -60,35 +84,35 @@ def main(file: str):
                 subject["scheme"] = "cca_local"
 
             # ULAN subjects are added to cca_local but with their ULAN URI as the ID
-            if auth.upper() == "ULAN":
-                if not row["Auth URI"]:
+            elif auth_upper == "ULAN":
+                if not row[uri_col]:
                     raise ValueError(
                         f"No Auth URI for ULAN subject: {term}\nAll ULAN subjects must have an Auth URI."
                     )
-                subject["id"] = row["Auth URI"]
+                subject["id"] = row[uri_col]
                 subject["scheme"] = "cca_local"
 
             # Covers multiple LC authorities: LCNAF, LCSH, LCGFT
-            elif auth.upper().startswith("LC"):
-                if not row["Auth URI"]:
+            elif auth_upper.startswith("LC"):
+                if not row[uri_col]:
                     raise ValueError(
                         f"No Auth URI for LC subject: {term} ({auth})\nAll LC subjects must have an Auth URI."
                     )
-                subject["id"] = row["Auth URI"]
+                subject["id"] = row[uri_col]
                 subject["scheme"] = "lc"
 
-            subjects_map[row["VAULT value"].lower()] = subject["id"]
+            subjects_map[vault_value.lower()] = subject["id"]
             # combined terms are not added to the final vocab files (but are in the map)
             if status == "done":
-                locals()[subject["scheme"]].append(subject)
+                vocabs[subject["scheme"]].append(subject)
 
         # premade sub-vocabs to be added to cca_local
         for filename in [
             "subject_names.yaml",
             "programs.yaml",
         ]:  # TODO: archives series
-            with open(Path("vocab") / filename, "r") as fh:
-                terms = yaml.load(fh, Loader=yaml.FullLoader)
+            with open(Path("vocab") / filename, "r", encoding="utf-8") as fh:
+                terms = yaml.load(fh, Loader=SafeLoader)
                 for term in terms:
                     assert type(term) == dict  # solely for type hinting
                     # if term has already been added to the subjects_map, skip it
@@ -97,7 +121,7 @@ def main(file: str):
                     # assign an ID that matches what we have in the map from combined subjects.csv terms
                     term["id"] = get_uuid(term["subject"])
                     subjects_map[term_text] = term["id"]
-                    locals()[term["scheme"]].append(term)
+                    vocabs[term["scheme"]].append(term)
 
         dump_all(subjects_map, cca_local, lc)
 
@@ -1,62 +1,146 @@
-""" Parse names and lists of names from a variety of formats into {given_name, family_name} dicts
-This is used by Record.creator only. It does not relate to the Invenio names.yaml vocabulary."""
+"""Parse names and lists of names from a variety of formats into {given_name, family_name} dicts
+This is used by Record.creator only. It does not relate to the Invenio names.yaml vocabulary.
+"""
 
+import os
 import re
+import threading
+from typing import Iterable, Iterator
 
 import spacy
 
-# TODO add env var to skip loading spacy model when not needed (for faster testing)
-nlp = spacy.load("en_core_web_lg")
-nlp.select_pipes(enable=["ner"])
+# words only seen in organization names, these don't need NER to tell them apart
+org_words_re = re.compile(
+    r"\b(?:Association|College|Foundation|Gallery|Inc|Institute|Museum|School|Society|University)\b"
+)
+
+# lists of names are separated by semicolons or, in two items, plus signs
+list_split_re = re.compile(r"; | \+ ")
+# names starting with CCA or CCAC are our orgs
+ccac_re = re.compile(r"\bCCAC?")
+# birth/death years after a name, e.g. "1882-1941" or "1984-"
+life_dates_re = re.compile(r"[0-9]{4}\-([0-9]{4})?")
+
+# NER results by string, filled in bulk by prime_ner and on demand by ner
+_ents: dict[str, list[tuple[str, str]]] = {}
+
+# the spacy model, loaded by get_nlp on first use
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    # load the model on first use so code that never runs NER doesn't pay for it
+    # the lock makes concurrent first callers wait for one load instead of each loading
+    # only ner is used, the other pipes aren't loaded at all (ner has its own tok2vec)
+    # SPACY_MODEL=en_core_web_sm loads much faster, at some cost in NER accuracy
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                _nlp = spacy.load(
+                    os.environ.get("SPACY_MODEL", "en_core_web_lg"),
+                    exclude=[
+                        "tok2vec",
+                        "tagger",
+                        "parser",
+                        "attribute_ruler",
+                        "lemmatizer",
+                        "senter",
+                    ],
+                )
+    return _nlp
+
+
+def doc_ents(doc) -> list[tuple[str, str]]:
+    # return a list of named PERSON or ORG entities as (label, text) from a spacy doc
+    # https://spacy.io/usage/linguistic-features#named-entities
+    return [(e.label_, e.text) for e in doc.ents if e.label_ in ("PERSON", "ORG")]
 
 
 def ner(str):
     # return a list of named PERSON or ORG entities from a string
-    # https://spacy.io/usage/linguistic-features#named-entities
-    doc = nlp(str)
-    return [
-        {"entity": e.text, "type": e.label_}
-        for e in doc.ents
-        if e.label_ in ("PERSON", "ORG")
-    ]
+    if str not in _ents:
+        _ents[str] = doc_ents(get_nlp()(str))
+    return _ents[str]
+
+
+def ner_candidates(namePart: str) -> Iterator[str]:
+    """yield the strings parse_name(namePart) runs NER on, without running it
+    Parts of a comma-separated list are only known after NER so they're not included.
+    """
+    names = list_split_re.split(namePart)
+    if len(names) > 1:
+        for p in names:
+            yield from ner_candidates(p)
+    elif "," in namePart:
+        parts = namePart.split(", ")
+        if len(parts) == 3 and life_dates_re.match(parts[2].strip()):
+            return
+        if len(parts) > 2:
+            yield namePart
+    elif (
+        not ccac_re.match(namePart)
+        and len(namePart.split(" ")) > 2
+        and not org_words_re.search(namePart)
+    ):
+        yield namePart
+
+
+def prime_ner(nameParts: Iterable[str]) -> None:
+    """run NER over all the strings parse_name will need in one nlp.pipe pass
+    nlp.pipe batches docs through the model, much faster than one nlp() call each"""
+    # dict.fromkeys dedupes repeated names (common across records) keeping their order
+    pending = list(
+        dict.fromkeys(t for p in nameParts for t in ner_candidates(p) if t not in _ents)
+    )
+    if not pending:
+        return
+    # settings are read here, not on import, so a bad value only fails once NER runs
+    docs = get_nlp().pipe(
+        pending,
+        # number of strings nlp.pipe processes together
+        batch_size=int(os.environ.get("SPACY_BATCH_SIZE", 256)),
+        # worker processes, forking only pays off on large batches so default to 1
+        n_process=int(os.environ.get("SPACY_N_PROCESS", 1)),
+    )
+    for text, doc in zip(pending, docs):
+        _ents[text] = doc_ents(doc)
 
 
 def entity_to_name(entity, namePart):
-    if entity["type"] == "PERSON":
-        return parse_name(entity["entity"])
+    label, text = entity
+    if label == "PERSON":
+        return parse_name(text)
     else:
         # default to organization
         return {"name": namePart}
 
 
 def n(d) -> dict[str, str]:
-    """add person/org type to name dict"""
-    if (
-        d.get("name")
-        and type(d.get("given_name")) != str
-        and type(d.get("family_name")) != str
-    ):
-        ntype = "organizational"
+    """add person/org type to name dict, callers pass a fresh dict so set it in place"""
+    has_given = isinstance(d.get("given_name"), str)
+    has_family = isinstance(d.get("family_name"), str)
+    if d.get("name") and not has_given and not has_family:
+        d["type"] = "organizational"
     # it's ok if person names are falsey, empty, but they must be strings
-    elif type(d.get("given_name")) == str and type(d.get("family_name")) == str:
-        ntype = "personal"
+    elif has_given and has_family:
+        d["type"] = "personal"
     else:
         raise Exception(
             f"Invalid name dict, has neither name nor family_name & given_name: {d}"
         )
-    return {**d, "type": ntype}
+    return d
 
 
 def parse_name(namePart):
     """parse wild variety of name strings into {givename, familyname}
     or, if it looks like an orgnaization name, return only {name}"""
 
-    # semi-colon separated list of names
-    if "; " in namePart:
-        return [parse_name(p) for p in namePart.split("; ")]
-    # there are two plus-separated lists of names in the data
-    if " + " in namePart:
-        return [parse_name(p) for p in namePart.split(" + ")]
+    # semi-colon separated list of names, there are also two plus-separated lists
+    names = list_split_re.split(namePart)
+    if len(names) > 1:
+        return [parse_name(p) for p in names]
 
     # usually Surname, Givenname but sometimes other things
     if "," in namePart:
@@ -68,7 +152,7 @@ def parse_name(namePart):
                 return n({"name": namePart})
             return n({"given_name": parts[1], "family_name": parts[0]})
         # name with a DOB/dath date string after a second comma
-        if len(parts) == 3 and re.match(r"[0-9]{4}\-([0-9]{4})?", parts[2].strip()):
+        if len(parts) == 3 and life_dates_re.match(parts[2].strip()):
             return n({"given_name": parts[1], "family_name": parts[0]})
         # two or more commas, maybe we have a comma-separated list of names?
         if len(parts) > 2:
@@ -81,7 +165,7 @@ def parse_name(namePart):
                 return entity_to_name(entities[0], namePart)
             if len(entities) > 1:
                 # if we have more than one PERSON entity, assume we have a list of names
-                if len([e for e in entities if e["type"] == "PERSON"]) > 1:
+                if sum(label == "PERSON" for label, _ in entities) > 1:
                     return [parse_name(p) for p in parts]
                 # multiple entities of mixed types
                 raise Exception(
@@ -90,7 +174,7 @@ def parse_name(namePart):
     # split on spaces, often "Givenname Surname", but multiple spaces is where it gets tricky
     else:
         # various CCA(C) org names are easily mistaken for personal names
-        if re.match(r"\bCCAC?", namePart):
+        if ccac_re.match(namePart):
             return n({"name": namePart})
         parts = namePart.split(" ")
         if len(parts) == 1:
@@ -100,18 +184,18 @@ def parse_name(namePart):
             return n({"given_name": parts[0], "family_name": parts[1]})
         if len(parts) > 2:
             # could be "First Second Third" name or an organization
+            if org_words_re.search(namePart):
+                return n({"name": namePart})
             entities = ner(namePart)
             if len(entities) == 0:
                 # no entities, most likely an organization
                 return n({"name": namePart})
-            elif len(entities) == 1 and entities[0]["type"] == "PERSON":
+            elif len(entities) == 1 and entities[0][0] == "PERSON":
                 return n({"given_name": " ".join(parts[0:2]), "family_name": parts[2]})
-            elif len(entities) == 1 and entities[0]["type"] == "ORG":
+            elif len(entities) == 1 and entities[0][0] == "ORG":
                 return n({"name": namePart})
             # more than one entity but they're all PERSON, assume one name
-            elif len(entities) > 1 and len(
-                [e for e in entities if e["type"] == "PERSON"]
-            ) == len(entities):
+            elif len(entities) > 1 and all(label == "PERSON" for label, _ in entities):
                 l = len(parts)
                 return n(
                     {
@@ -5,20 +5,44 @@ Eventually this will accept a _directory_ containing the item's JSON and its
 attachments, but for staters we are taking just JSON.
 """
 
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import date
+from functools import cached_property
+from itertools import chain, islice
 import json
-import mimetypes
+import os
 import re
 import sys
 from typing import Any, List
 
 import xmltodict
 
-from names import parse_name
+from names import get_nlp, parse_name, prime_ner
 from maps import *
-from utils import find_items, get_url, mklist, to_edtf, visual_mime_type_sort
+from utils import (
+    find_items,
+    get_url,
+    guess_mime_type,
+    mklist,
+    to_edtf,
+    visual_mime_type_sort,
+)
 from subjects import find_subjects, Subject
 
+# zip attachments live in a "_zips/" folder, e.g. "_zips/archive.zip"
+zips_folder_re = re.compile(r"_zips\/")
+# any license_text_map key, so one search finds a license in long access conditions
+license_text_re = re.compile("|".join(re.escape(k) for k in license_text_map))
+# affiliations that are CCA itself, which ccaAffiliated already covers
+cca_re = re.compile(
+    r"CCA/?C?|California College of (?:the )?Arts(?: and Crafts)?", flags=re.IGNORECASE
+)
+# description types, shared by every description of that type
+# plain dicts (not MappingProxyType) because they're serialized to JSON, don't mutate
+abstract_desc_type = {"id": "abstract", "title": {"en": "Abstract"}}
+other_desc_type = {"id": "other", "title": {"en": "Other"}}
+
 
 def postprocessor(path, key, value):
     """XML postprocessor, ensure that empty XML nodes like <foo></foo> are empty
@@ -33,7 +57,11 @@ def postprocessor(path, key, value):
 
 class Record:
     def __init__(self, item):
+        # xmltodict already sets expat's buffer_text so text nodes like long
+        # abstracts arrive as one string, it does not accept a buffer_text kwarg
         self.xml = xmltodict.parse(item["metadata"], postprocessor=postprocessor)["xml"]
+        # nearly every property reads from mods so look it up once
+        self.mods: dict[str, Any] = self.xml.get("mods", {})
         self.attachments: list[dict[str, Any]] = sorted(
             [
                 a
@@ -46,7 +74,7 @@ class Record:
         # https://github.com/cca/equella_scripts/blob/3dd8ca3e35e7b316beb6b399cab0d09281a12bda/collection-export/collect.js#L109-L129
         # TODO what about filenames changed by filenamify like unpacked zips?
         for a in self.attachments:
-            a["name"] = a.get("filename") or re.sub(r"_zips\/", "", a["folder"])
+            a["name"] = a.get("filename") or zips_folder_re.sub("", a["folder"])
             if a["type"] == "htmlpage":
                 a["name"] = f'{a["uuid"]}.html'
         # url and "custom" youtube attachments
@@ -62,52 +90,32 @@ class Record:
                 f"https://vault.cca.edu/items/{item['uuid']}/{item['version']}/"
             )
 
-    @property
+    @cached_property
     def abstracts(self) -> list:
-        abs = mklist(self.xml.get("mods", {}).get("abstract", ""))
+        abs = mklist(self.mods.get("abstract", ""))
         # filter out all empty strings except the first one
-        for idx, a in enumerate(abs):
-            if idx > 0 and not a:
-                abs.remove(a)
-        return abs
+        return [a for idx, a in enumerate(abs) if idx == 0 or a]
 
-    @property
+    @cached_property
     def addl_titles(self) -> list[dict[str, str]]:
         # extra /mods/titleInfo/title entries, titleInfo/subtitle
         # https://inveniordm.docs.cern.ch/reference/metadata/#additional-titles-0-n
         # types: alternative-title, descriptive-title, other, subtitle, transcribed-title, translated-title
         # https://github.com/cca/cca_invenio/blob/main/app_data/vocabularies/title_types.yaml
         atitles = []
-        titleinfos = mklist(self.xml.get("mods", {}).get("titleInfo"))
+        titleinfos = mklist(self.mods.get("titleInfo"))
         for idx, titleinfo in enumerate(titleinfos):
             # all subtitles
             for subtitle in mklist(titleinfo.get("subTitle")):
                 atitles.append({"title": subtitle, "type": {"id": "subtitle"}})
             # titles other than the first
-            for title in mklist(titleinfo.get("title")):
-                if idx > 0:
-                    ttype = titleinfo.get("@type")
-                    if ttype == "alternative":
-                        atitles.append(
-                            {"title": title, "type": {"id": "alternative-title"}}
-                        )
-                    elif ttype == "descriptive":
-                        atitles.append(
-                            {"title": title, "type": {"id": "descriptive-title"}}
-                        )
-                    elif ttype == "transcribed":
-                        atitles.append(
-                            {"title": title, "type": {"id": "transcribed-title"}}
-                        )
-                    elif ttype == "translated":
-                        atitles.append(
-                            {"title": title, "type": {"id": "translated-title"}}
-                        )
-                    else:
-                        atitles.append({"title": title, "type": {"id": "other"}})
+            if idx > 0:
+                ttype = title_type_map.get(titleinfo.get("@type"), "other")
+                for title in mklist(titleinfo.get("title")):
+                    atitles.append({"title": title, "type": {"id": ttype}})
         return atitles
 
-    @property
+    @cached_property
     def archives_series(self) -> dict[str, str] | None:
         archives_wrapper = self.xml.get("local", {}).get("archivesWrapper")
         series = archives_wrapper.get("series") if archives_wrapper else None
@@ -118,16 +126,18 @@ class Record:
             return {"series": series, "subseries": subseries}
         return {}
 
-    @property
+    @cached_property
     def creators(self) -> list[dict[str, Any]]:
         # mods/name
         # https://inveniordm.docs.cern.ch/reference/metadata/#creators-1-n
-        namesx = mklist(self.xml.get("mods", {}).get("name"))
+        namesx = mklist(self.mods.get("name"))
+        # run NER on all the record's names in one batch instead of name by name
+        prime_ner(self.nameparts)
         creators = []
         for namex in namesx:
             # @usage = primary, secondary | ignoring this but could say sec. -> contributor, not creator
             partsx = namex.get("namePart")
-            if type(partsx) == str:
+            if isinstance(partsx, str):
                 # initialize, use affiliation set to dedupe them
                 creator = {"person_or_org": {}, "affiliations": [], "role": {}}
 
@@ -135,12 +145,9 @@ class Record:
                 rolex = mklist(namex.get("role", {}).get("roleTerm"))
                 if len(rolex):
                     rolex = rolex[0]
-                    role: str = rolex if type(rolex) == str else rolex.get("#text")
+                    role: str = rolex if isinstance(rolex, str) else rolex.get("#text")
                     role = role.lower().replace(" ", "")
-                    if role in role_map:
-                        creator["role"]["id"] = role_map[role]
-                    else:
-                        creator["role"]["id"] = role
+                    creator["role"]["id"] = role_map.get(role, role)
 
                 # Affiliations
                 affs = []
@@ -152,23 +159,18 @@ class Record:
                         affsx = mklist(subnamex.get("affiliation"))
                         # skip our false positives of ccaAffiliated: No | affiliation: CCA
                         for affx in affsx:
-                            if (
-                                affx
-                                and not re.match(r"CCA/?C?", affx, flags=re.IGNORECASE)
-                                and not re.match(
-                                    r"California College of (the)? Arts (and Crafts)?",
-                                    affx,
-                                    flags=re.IGNORECASE,
-                                )
-                            ):
+                            if affx and not cca_re.match(affx):
                                 affs.append({"name": affx})
-                # dedupe list of dictionaries
-                creator["affiliations"] = list(
-                    {frozenset(d.items()): d for d in affs}.values()
-                )
+                # dedupe list of dictionaries, each has a single id or name key
+                seen = set()
+                for aff in affs:
+                    key = next(iter(aff.items()))
+                    if key not in seen:
+                        seen.add(key)
+                        creator["affiliations"].append(aff)
 
                 names = parse_name(partsx)
-                if type(names) == dict:
+                if isinstance(names, dict):
                     creators.append(
                         {
                             "person_or_org": names,
@@ -176,16 +178,16 @@ class Record:
                             "affiliations": creator["affiliations"],
                         }
                     )
-                # implies type(names) == list, similar to below, if parse_name returns a
+                # implies names is a list, similar to below, if parse_name returns a
                 # list of names but we have role/affiliation then something is wrong
                 elif creator.get("role") or len(creator.get("affiliation", [])):
                     raise Exception(
                         f"Unexpected mods/name structure: parse_name(namePart) returned a list but we also have role/affiliation. Name: {namex}"
                     )
-                elif type(names) == list:
+                elif isinstance(names, list):
                     for name in names:
                         creators.append({"person_or_org": name})
-            elif type(partsx) == list:
+            elif isinstance(partsx, list):
                 # if we have a list of nameParts then the other mods/name fields & attributes must not
                 # be present, but check this assumption
                 if (
@@ -201,7 +203,7 @@ class Record:
                         creators.append({"person_or_org": name})
         return creators
 
-    @property
+    @cached_property
     def custom_fields(self) -> dict[str, Any]:
         cf: dict[str, Any] = {}
         # 1) ArchivesSeries custom field, { series, subseries } dict
@@ -209,7 +211,7 @@ class Record:
             cf["cca:archives_series"] = self.archives_series
         return cf
 
-    @property
+    @cached_property
     def dates(self) -> list[dict[str, Any]]:
         dates = []
         # https://inveniordm.docs.cern.ch/reference/metadata/#dates-0-n
@@ -219,12 +221,10 @@ class Record:
         # https://github.com/cca/cca_invenio/blob/main/app_data/vocabularies/date_types.yaml
 
         # dateCreatedWrapper/dateCaptured
-        dates_capturedx = mklist(
-            self.xml.get("mods", {}).get("origininfo", {}).get("dateCaptured")
-        )
+        dates_capturedx = mklist(self.mods.get("origininfo", {}).get("dateCaptured"))
         for dc in dates_capturedx:
             # work with strings and dicts
-            dc = dc.get("#text") if type(dc) == dict else dc
+            dc = dc.get("#text") if isinstance(dc, dict) else dc
             if dc:  # could be empty string
                 dates.append(
                     {
@@ -236,12 +236,9 @@ class Record:
 
         # we always have exactly one dateOtherWrapper and 0-1 dateOther, praise be
         date_other = (
-            self.xml.get("mods", {})
-            .get("origininfo", {})
-            .get("dateOtherWrapper", {})
-            .get("dateOther")
+            self.mods.get("origininfo", {}).get("dateOtherWrapper", {}).get("dateOther")
         )
-        if type(date_other) == dict:
+        if isinstance(date_other, dict):
             date_other_text = to_edtf(date_other.get("#text"))
             if date_other_text:
                 # the only types we have are Agreement and E/exhibit (case sensitive)
@@ -260,7 +257,7 @@ class Record:
                 dates.append({"date": date_other_text, "type": {"id": "other"}})
         return dates
 
-    @property
+    @cached_property
     def descriptions(self) -> list[dict[str, Any]]:
         # extra /mods/abstract entries, mods/noteWrapper/note
         # https://inveniordm.docs.cern.ch/reference/metadata/#additional-descriptions-0-n
@@ -274,41 +271,22 @@ class Record:
         if len(self.abstracts) > 1:
             desc.extend(
                 [
-                    {
-                        "type": {"id": "abstract", "title": {"en": "Abstract"}},
-                        "description": a,
-                    }
+                    {"type": abstract_desc_type, "description": a}
                     for a in self.abstracts[1:]
                 ]
             )
 
         # we have _many_ MODS note types & none map cleanly to Invenio description types
-        noteWrappers = mklist(self.xml.get("mods", {}).get("noteWrapper", []))
-        notes = []
-        for wrapper in noteWrappers:
-            notes = notes + mklist(wrapper.get("note", []))
+        noteWrappers = mklist(self.mods.get("noteWrapper", []))
+        notes = chain.from_iterable(mklist(w.get("note", [])) for w in noteWrappers)
         for note in notes:
-            if type(note) == str and note:
-                desc.append(
-                    {
-                        "type": {"id": "other", "title": {"en": "Other"}},
-                        "description": note.strip(),
-                    }
-                )
-            elif type(note) == dict:
+            if isinstance(note, dict):
                 # prefix note with its type if we have one
                 ntype: str = note.get("@type", "").title()
-                note_text: str = note.get("#text", "")
-                note_text = (
-                    f"{ntype}: {note_text}" if ntype and note_text else note_text
-                )
-                if note_text:
-                    desc.append(
-                        {
-                            "type": {"id": "other", "title": {"en": "Other"}},
-                            "description": note_text.strip(),
-                        }
-                    )
+                note = note.get("#text", "")
+                note = f"{ntype}: {note}" if ntype and note else note
+            if isinstance(note, str) and note:
+                desc.append({"type": other_desc_type, "description": note.strip()})
 
         return desc
 
@@ -316,18 +294,28 @@ class Record:
     def formats(self) -> list[str]:
         formats = set()
         for file in self.attachments:
-            type = mimetypes.guess_type(file["name"], strict=False)[0]
+            type = guess_mime_type(file["name"], strict=False)
             if type:
                 formats.add(type)
         return list(formats)
 
-    @property
+    @cached_property
+    def nameparts(self) -> list[str]:
+        # every mods/name/namePart string, lets NER run on them in one batch
+        return [
+            part
+            for namex in mklist(self.mods.get("name"))
+            for part in mklist(namex.get("namePart"))
+            if isinstance(part, str)
+        ]
+
+    @cached_property
     def publication_date(self):
         # date created, add other/additional dates to self.dates[]
         # level 0 EDTF date (YYYY,  YYYY-MM, YYYY-MM-DD or slash separated range between 2 of these)
         # https://inveniordm.docs.cern.ch/reference/metadata/#publication-date-1
         # mods/originfo/dateCreatedWrapper/dateCreated (note lowercase origininfo) or item.createdDate
-        origininfosx = mklist(self.xml.get("mods", {}).get("origininfo", {}))
+        origininfosx = mklist(self.mods.get("origininfo", {}))
         for origininfox in origininfosx:
             # use dateCreatedWrapper/dateCreated if we have it
             dateCreatedWrappersx = mklist(origininfox.get("dateCreatedWrapper"))
@@ -336,9 +324,9 @@ class Record:
                 for dateCreated in dateCreatedsx:
                     # work around empty str or dict
                     if dateCreated:
-                        if type(dateCreated) == str:
+                        if isinstance(dateCreated, str):
                             edtf_date: str | None = to_edtf(dateCreated)
-                        elif type(dateCreated) == dict:
+                        elif isinstance(dateCreated, dict):
                             edtf_date: str | None = to_edtf(dateCreated.get("#text"))
                         if edtf_date:
                             return edtf_date
@@ -360,7 +348,7 @@ class Record:
         # fall back on when the VAULT record was made (item.createdDate)
         return to_edtf(self.createdDate)
 
-    @property
+    @cached_property
     def publisher(self) -> str:
         # https://inveniordm.docs.cern.ch/reference/metadata/#publisher-0-1
         # ! In DataCite 4.5 the publisher field supports identifiers
@@ -375,7 +363,7 @@ class Record:
         #     1997 - on: California College of the Arts
         # https://vault.cca.edu/items/bd3b483b-52b9-423c-a96e-d37863511d75/1/%3CXML%3E
         # mods/relatedItem[@type="host"]/titleInfo/title == DBR
-        related_item = self.xml.get("mods", {}).get("relatedItem", {})
+        related_item = self.mods.get("relatedItem", {})
         related_title_infos = mklist(related_item.get("titleInfo"))
         for ti in related_title_infos:
             if ti.get("title") == "Design Book Review":
@@ -395,10 +383,10 @@ class Record:
         # 2) CCA/C archives has publisher info mods/originInfo/publisher
         # https://vault.cca.edu/items/c4583fe6-2e85-4613-a1bc-774824b3e826/1/%3CXML%3E
         # records have multiple originInfo nodes
-        originInfos = mklist(self.xml.get("mods", {}).get("originInfo"))
+        originInfos = mklist(self.mods.get("originInfo"))
         for originInfo in originInfos:
             publisher = originInfo.get("publisher")
-            if type(publisher) == dict:
+            if isinstance(publisher, dict):
                 publisher = publisher.get("#text")
             if publisher:
                 return publisher.strip()
@@ -407,7 +395,7 @@ class Record:
         # 4) Student work has no publisher
         return ""
 
-    @property
+    @cached_property
     def related_identifiers(self) -> list[dict[str, str | dict[str, str]]]:
         # https://inveniordm.docs.cern.ch/reference/metadata/#related-identifiersworks-0-n
         # Default relation types: https://github.com/inveniosoftware/invenio-rdm-records/blob/master/invenio_rdm_records/fixtures/data/vocabularies/relation_types.yaml
@@ -444,7 +432,7 @@ class Record:
         # IDs in Invenio to create the relation
         return ri
 
-    @property
+    @cached_property
     def resource_type(self) -> dict[str, str]:
         # https://inveniordm.docs.cern.ch/reference/metadata/#resource-type-1
         # https://github.com/cca/cca_invenio/blob/main/app_data/vocabularies/resource_types.yaml
@@ -452,14 +440,14 @@ class Record:
         # 1. mods/typeOfResource, 2. local/courseWorkType, 3. TBD (there are more...)
         # mods/typeOfResourceWrapper/typeOfResource
         # Take the first typeOfResource value we find
-        wrapper = self.xml.get("mods", {}).get("typeOfResourceWrapper")
-        if type(wrapper) == list:
+        wrapper = self.mods.get("typeOfResourceWrapper")
+        if isinstance(wrapper, list):
             wrapper = wrapper[0]
-        if type(wrapper) == dict:
+        if isinstance(wrapper, dict):
             rtype = wrapper.get("typeOfResource", "")
-            if type(rtype) == list:
+            if isinstance(rtype, list):
                 rtype = rtype[0]
-            if type(rtype) == dict:
+            if isinstance(rtype, dict):
                 rtype = rtype.get("#text", "")
             if rtype in resource_type_map:
                 return {"id": resource_type_map[rtype]}
@@ -469,36 +457,39 @@ class Record:
         # default to publication
         return {"id": "publication"}
 
-    @property
+    @cached_property
     def rights(self) -> List[dict[str, str | dict[str, str]]]:
         # https://inveniordm.docs.cern.ch/reference/metadata/#rights-licenses-0-n
         # Choices: https://github.com/cca/cca_invenio/blob/main/app_data/vocabularies/licenses.csv
-        # We always have exactly one accessCondition node, str or dict
-        accessCondition = self.xml.get("mods", {}).get("accessCondition", "")
-        if type(accessCondition) == dict:
-            # if we have a href attribute prefer that
-            href = accessCondition.get("@href", None)
-            if href and href in license_href_map:
-                return [{"id": license_href_map[href]}]
-            # if we didn't find a usable href then use the text
-            accessCondition = accessCondition.get("#text", "")
+        # Usually one accessCondition node, str or dict, but some items have several
+        texts = []
+        for accessCondition in mklist(self.mods.get("accessCondition")):
+            if isinstance(accessCondition, dict):
+                # if we have a href attribute prefer that
+                href = accessCondition.get("@href", None)
+                if href and href in license_href_map:
+                    return [{"id": license_href_map[href]}]
+                # if we didn't find a usable href then use the text
+                accessCondition = accessCondition.get("#text")
+            if accessCondition:
+                texts.append(accessCondition)
 
         # use substring matching—some long ACs contain the license name or URL
-        for key in license_text_map.keys():
-            if key in accessCondition:
-                return [{"id": license_text_map[key]}]
+        # if several licenses are mentioned the first one in the text wins
+        if match := license_text_re.search(" ".join(texts)):
+            return [{"id": license_text_map[match.group(0)]}]
 
         # default to copyright
         return [{"id": "copyright"}]
 
-    @property
+    @cached_property
     def sizes(self) -> list[str]:
         # mods/physicalDescription/extent
         # https://inveniordm.docs.cern.ch/reference/metadata/#sizes-0-n
         extents = []
 
-        extent = self.xml.get("mods", {}).get("physicalDescription", {}).get("extent")
-        if type(extent) == dict:
+        extent = self.mods.get("physicalDescription", {}).get("extent")
+        if isinstance(extent, dict):
             extent = extent.get("#text")
         if extent:
             extents.append(extent)
@@ -506,7 +497,7 @@ class Record:
         # TODO there will be /local extent values in student work items
         return extents
 
-    @property
+    @cached_property
     def subjects(self) -> list[dict[str, str]]:
         # https://inveniordm.docs.cern.ch/reference/metadata/#subjects-0-n
         # Subjects are {id} or {subject} dicts
@@ -515,6 +506,7 @@ class Record:
         return [s.to_invenio() for s in subjects]
 
     def get(self) -> dict[str, Any]:
+        filenames = [att["name"] for att in self.attachments]
         return {
             # TODO restricted access based on local/viewLevel value
             "access": {
@@ -524,12 +516,10 @@ class Record:
             # ! blocked until we know what custom fields we'll have
             "custom_fields": self.custom_fields,
             "files": {
-                "enabled": bool(len(self.attachments)),
+                "enabled": bool(filenames),
                 # ! API drops these, whether we define before adding files or after
-                "order": [att["name"] for att in self.attachments],
-                "default_preview": (
-                    self.attachments[0]["name"] if len(self.attachments) else ""
-                ),
+                "order": filenames,
+                "default_preview": filenames[0] if filenames else "",
             },
             # "files": {
             #     "enabled": bool(len(self.files)),
@@ -545,7 +535,7 @@ class Record:
                 "contributors": [],
                 "creators": self.creators,
                 "dates": self.dates,
-                "description": self.abstracts[0],
+                "description": self.abstracts[0] if self.abstracts else "",
                 "formats": self.formats,
                 # https://inveniordm.docs.cern.ch/reference/metadata/#locations-0-n
                 # not available on deposit form and does not display anywhere, skip for now
@@ -566,11 +556,47 @@ class Record:
         }
 
 
+def convert(items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    # module-level so ProcessPoolExecutor workers can unpickle it
+    records = [Record(item) for item in items]
+    # run NER on the whole batch's names in one nlp.pipe pass, not record by record
+    prime_ner(chain.from_iterable(r.nameparts for r in records))
+    return [r.get() for r in records]
+
+
+def init_worker() -> None:
+    # pool workers are daemonic and can't start nlp.pipe processes of their own
+    os.environ["SPACY_N_PROCESS"] = "1"
+
+
+def dump(records: list[dict[str, Any]]) -> None:
+    # JSON pretty print records
+    for record in records:
+        json.dump(record, sys.stdout, indent=2)
+
+
 if __name__ == "__main__":
     # we assume first arg is path to the item JSON
-    for file in sys.argv[1:]:
-        items = find_items(file)
-        for item in items:
-            r = Record(item)
-            # JSON pretty print record
-            json.dump(r.get(), sys.stdout, indent=2)
+    items = (item for file in sys.argv[1:] for item in find_items(file))
+    # convert items a batch at a time, an empty batch means we're out of items
+    batches = iter(lambda: list(islice(items, 16)), [])
+    # serial by default, RECORD_PROCESSES > 1 converts a large export in parallel
+    processes = int(os.environ.get("RECORD_PROCESSES", 1))
+    if processes <= 1:
+        for batch in batches:
+            dump(convert(batch))
+    else:
+        # load the model before forking so workers share it instead of each loading it
+        get_nlp()
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=init_worker
+        ) as executor:
+            # submit only a few batches ahead of the output so a large search dump
+            # isn't read & converted up front, print them in submission order
+            pending: deque[Future] = deque()
+            for batch in batches:
+                if len(pending) >= processes * 2:
+                    dump(pending.popleft().result())
+                pending.append(executor.submit(convert, batch))
+            while pending:
+                dump(pending.popleft().result())
@@ -1,8 +1,11 @@
+from unittest.mock import patch
+
 from edtf import text_to_edtf
 import pytest
 import xmltodict
 
-from names import parse_name
+import names
+from names import ner_candidates, parse_name
 from record import Record
 from subjects import find_subjects, subjects_from_xmldict, Subject, TYPES
 from utils import get_url, mklist, to_edtf, visual_mime_type_sort
@@ -235,6 +238,10 @@ def test_archives_series(input, expect):
                 "type": "organizational",
             },
         ),
+        (
+            "San Francisco Art Institute",
+            {"name": "San Francisco Art Institute", "type": "organizational"},
+        ),
         (
             "CCAC Libraries; CCA Sputnik",
             [
@@ -242,10 +249,29 @@ def test_archives_series(input, expect):
                 {"name": "CCA Sputnik", "type": "organizational"},
             ],
         ),
+        (  # mixed separators give one flat list, not a list nested in a list
+            "Maria Rodriguez; Carland, Tammy Rae + Hanna, Kathleen",
+            [
+                {"family_name": "Rodriguez", "given_name": "Maria", "type": "personal"},
+                {
+                    "family_name": "Carland",
+                    "given_name": "Tammy Rae",
+                    "type": "personal",
+                },
+                {"family_name": "Hanna", "given_name": "Kathleen", "type": "personal"},
+            ],
+        ),
     ],
 )
 def test_parse_name(input, expect):
-    assert parse_name(input) == expect
+    # prime_ner relies on ner_candidates predicting every string parse_name runs NER
+    # on, except the parts of a comma-separated list, which are only known after NER
+    with patch("names.ner", wraps=names.ner) as ner:
+        assert parse_name(input) == expect
+    candidates = set(ner_candidates(input))
+    list_parts = {p for c in candidates for p in c.split(", ")}
+    for call in ner.call_args_list:
+        assert call.args[0] in candidates | list_parts
 
 
 # Creators (names in context of a Record)
@@ -288,6 +314,12 @@ def test_creators(input, expect):
             ),
             [[]],
         ),
+        (
+            x(
+                "<mods><name><namePart>A B</namePart><subNameWrapper><ccaAffiliated>No</ccaAffiliated><affiliation>California College of Arts and Crafts</affiliation></subNameWrapper></name></mods>"
+            ),
+            [[]],
+        ),
         (
             x(
                 "<mods><name><namePart>A B</namePart><subNameWrapper><affiliation>Other Place</affiliation></subNameWrapper></name></mods>"
@@ -369,6 +401,16 @@ def test_creator_roles(input, expect):
         (x("<mods><abstract>foo</abstract></mods>"), "foo"),
         (x("<mods><abstract>foo</abstract><abstract>bar</abstract></mods>"), "foo"),
         (x("<mods></mods>"), ""),
+        (  # empty abstracts after the first are skipped, even two in a row
+            x(
+                "<mods><abstract>foo</abstract><abstract></abstract><abstract></abstract><abstract>bar</abstract></mods>"
+            ),
+            "foo",
+        ),
+        (  # the first abstract is the description even if it's empty
+            x("<mods><abstract></abstract><abstract>foo</abstract></mods>"),
+            {},
+        ),
     ],
 )
 def test_desc(input, expect):
@@ -376,6 +418,14 @@ def test_desc(input, expect):
     assert m(r)["description"] == expect
 
 
+def test_desc_no_abstracts():
+    # mods always yields at least one abstract but get() shouldn't depend on it
+    r = Record(x("<mods></mods>"))
+    r.abstracts = []
+    assert m(r)["description"] == ""
+    assert m(r)["additional_descriptions"] == []
+
+
 # Additional Descriptions
 @pytest.mark.parametrize(
     "input, expect",
@@ -413,6 +463,28 @@ def test_desc(input, expect):
             x("<mods><abstract>foo</abstract><abstract></abstract></mods>"),
             [],
         ),
+        (  # two empty abstracts in a row are both skipped
+            x(
+                "<mods><abstract>foo</abstract><abstract></abstract><abstract></abstract><abstract>bar</abstract></mods>"
+            ),
+            [
+                {
+                    "type": {"id": "abstract", "title": {"en": "Abstract"}},
+                    "description": "bar",
+                }
+            ],
+        ),
+        (  # leading empty abstract, the next one is still an additional description
+            x(
+                "<mods><abstract></abstract><abstract></abstract><abstract>foo</abstract></mods>"
+            ),
+            [
+                {
+                    "type": {"id": "abstract", "title": {"en": "Abstract"}},
+                    "description": "foo",
+                }
+            ],
+        ),
     ],
 )
 def test_addl_desc(input, expect):
@@ -778,6 +850,24 @@ def test_related_identifiers(input, expect):
             ),
             "cc-by-nc-4.0",
         ),
+        (  # first license mentioned in the text wins, not the first in license_text_map
+            x(
+                "<mods><accessCondition>Licensed under https://creativecommons.org/licenses/by-nc/4.0/ (formerly CC BY 4.0)</accessCondition></mods>"
+            ),
+            "cc-by-nc-4.0",
+        ),
+        (  # two accessConditions, license in the second
+            x(
+                "<mods><accessCondition type='use and reproduction'>Contact the CCA Libraries with questions.</accessCondition><accessCondition>CC BY-NC-SA 4.0</accessCondition></mods>"
+            ),
+            "cc-by-nc-sa-4.0",
+        ),
+        (  # two accessConditions, CC href on the second
+            x(
+                "<mods><accessCondition>For rights relating to this resource, please contact the CCA First Year Office.</accessCondition><accessCondition href='https://creativecommons.org/licenses/by-nc/4.0/'>CCA Libraries</accessCondition></mods>"
+            ),
+            "cc-by-nc-4.0",
+        ),
         (  # no accessCondition
             x("<mods></mods>"),
             "copyright",
@@ -1,6 +1,9 @@
+from functools import lru_cache
 import json
 import mimetypes
+from pathlib import PurePath
 import re
+from typing import Iterator
 from urllib.parse import urlparse
 
 from edtf import text_to_edtf
@@ -8,20 +11,20 @@ from edtf import text_to_edtf
 
 # support three types of files: single item json, search results json with
 # multiple items in "results" property, and XML metadata with no item JSON
-def find_items(file) -> list:
+# yields items one at a time so callers can process (and drop) each Record
+# before the next file is read
+def find_items(file) -> Iterator[dict]:
     if file.endswith(".json"):
         with open(file) as f:
             data = json.load(f)
-            if data.get("results"):
-                return data["results"]
-            else:
-                return [data]
+        if data.get("results"):
+            yield from data["results"]
+        else:
+            yield data
     elif file.endswith(".xml"):
         with open(file) as f:
-            xml = f.read()
-            return [{"metadata": xml}]
-    # non-data file (like .py or .txt) so skip gracefully
-    return []
+            yield {"metadata": f.read()}
+    # non-data file (like .py or .txt) is skipped gracefully
 
 
 # ensure valid URLs
@@ -38,9 +41,9 @@ def get_url(url: str) -> str | None:
 
 def mklist(x) -> list:
     # ensure value is a list
-    if type(x) == list:
+    if isinstance(x, list):
         return x
-    elif type(x) == str or type(x) == dict:
+    elif isinstance(x, (str, dict)):
         return [x]
     elif x is None:
         return []
@@ -52,6 +55,15 @@ def mklist(x) -> list:
 # https://www.loc.gov/standards/datetime/
 # "The values 21, 22, 23, 24 may be used used to signify ' Spring', 'Summer', 'Autumn', 'Winter', respectively, in place of a month value (01 through 12) for a year-and-month format string."
 def to_edtf(s) -> str | None:
+    # the same date strings repeat across records so cache their conversions
+    # anything else (None, {} from empty nodes) isn't hashable or common, don't cache
+    if isinstance(s, str):
+        return _to_edtf(s)
+    return _to_edtf.__wrapped__(s)
+
+
+@lru_cache(maxsize=4096)
+def _to_edtf(s) -> str | None:
     # map season to approx month in season
     season_map = {
         "21": "02",
@@ -69,6 +81,17 @@ def to_edtf(s) -> str | None:
     return text
 
 
+@lru_cache(maxsize=256)
+def _guess_by_suffixes(suffixes: str, strict: bool) -> str | None:
+    return mimetypes.guess_type(f"file{suffixes}", strict=strict)[0]
+
+
+def guess_mime_type(filename: str, strict: bool = True) -> str | None:
+    # guess_type only looks at the last extension, or two for e.g. .tar.gz, and
+    # attachments share a handful of extensions so cache guesses by those
+    return _guess_by_suffixes("".join(PurePath(filename).suffixes[-2:]), strict)
+
+
 def visual_mime_type_sort(attachment) -> int:
     # Sort EQUELLA attachment dicts by MIME type, types previewable in Invenio
     # which is (according to readme): PDF, ZIP, CSV, MARKDOWN, XML, JSON, PNG, JPG, GIF
@@ -78,7 +101,7 @@ def visual_mime_type_sort(attachment) -> int:
     # https://developer.mozilla.org/en-US/docs/Web/HTTP/Basics_of_HTTP/MIME_types#types
     # type=zip attachments have a "folder" but no "filename"
     fn = attachment.get("filename") or attachment["folder"]
-    guess: str | None = mimetypes.guess_type(fn)[0]
+    guess: str | None = guess_mime_type(fn)
     type, subtype = guess.split("/") if guess else ("unknown", "unknown")
     match type, subtype:
         case "image", "tiff":
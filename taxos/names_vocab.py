@@ -7,6 +7,12 @@ import json
 import click
 import yaml
 
+# libyaml's C emitter when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
 
 def convert(term: dict[str, str]) -> dict[str, str] | None:
     """convert EQUELLA local auth names taxo term into Invenio name
@@ -32,16 +38,15 @@ def convert(term: dict[str, str]) -> dict[str, str] | None:
 )
 def main(file) -> None:
     """Convert FILE ("LIBRARIES - subject name" taxo JSON) to Invenio subjects names.yaml"""
-    output: list[dict[str, str]] = []
     with file:
         terms: list[dict[str, str]] = json.load(file)
 
-    for name in terms:
-        if converted := convert(name):
-            output.append(converted)
+    output: list[dict[str, str]] = [
+        converted for name in terms if (converted := convert(name))
+    ]
 
     with open("vocab/subject_names.yaml", "w") as f:
-        yaml.dump(output, f, allow_unicode=True)
+        yaml.dump(output, f, Dumper=SafeDumper, allow_unicode=True)
 
 
 if __name__ == "__main__":